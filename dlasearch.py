@@ -12,7 +12,6 @@ import fitsio
 from astropy.table import Table, vstack
 
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor
 
 from functools import partial
 import time
@@ -28,13 +27,30 @@ import constants
 # import dlaprofile
 from fitwarning import DLAFLAG
 
-import warnings
-from scipy.optimize import OptimizeWarning
-
 from run_bayes_select import DLAHolder
 from gpy_dla_detection.set_parameters import Parameters
-
-warnings.simplefilter("error", OptimizeWarning)
+from gpy_dla_detection.dla_gp import make_executor
+
+# columns of the DLA catalog built by process_spectra_group: the ones shared
+# with Allyson's finder followed by the GP-DLA results
+FITRESULTS_COLUMNS = [
+    ("TARGETID", np.int64),
+    ("RA", np.float64),
+    ("DEC", np.float64),
+    ("Z", np.float64),
+    ("SNR", np.float64),
+    ("DLAID", "U32"),
+    ("Z_DLA", np.float64),
+    ("Z_DLA_ERR", np.float64),
+    ("NHI", np.float64),
+    ("NHI_ERR", np.float64),
+    ("DLAFLAG", np.int64),
+    ("P_DLA", np.float64),  # posterior probability of DLA model
+    ("P_NULL", np.float64),  # posterior probability of no DLA model
+    ("LOGP_DLA", np.float64),  # log posterior probability of DLA model
+    ("LOGP_NULL", np.float64),  # log posterior probability of no DLA model
+    ("MODEL_P", np.float64),  # model posterior probabilities
+]
 
 #### FOR TESTING ONLY ####
 # import matplotlib.pyplot as plt
@@ -88,7 +104,7 @@ def dlasearch_hpx(healpix, survey, program, datapath, hpxcat, model_params, npro
         )
 
         # Create a nested executor
-        with ProcessPoolExecutor(max_workers=nproc) as nested_executor:
+        with make_executor(max_workers=nproc) as nested_executor:
             fitresults = process_spectra_group(coadd, hpxcat, model, nested_executor)
 
     else:
@@ -162,7 +178,7 @@ def dlasearch_mock(specfile, catalog, model_params, nproc):
 
     if os.path.exists(specfile):
         fm = desispec.io.read_fibermap(specfile)
-        tidmask = np.in1d(catalog["TARGETID"], fm["TARGETID"])
+        tidmask = np.isin(catalog["TARGETID"], fm["TARGETID"])
         catalog = catalog[tidmask]
         if len(catalog) < 1:
             return ()
@@ -189,7 +205,7 @@ def dlasearch_mock(specfile, catalog, model_params, nproc):
         )
 
         # Create a nested executor
-        with ProcessPoolExecutor(max_workers=nproc) as nested_executor:
+        with make_executor(max_workers=nproc) as nested_executor:
             fitresults = process_spectra_group(
                 specfile, catalog, model, nested_executor
             )
@@ -274,21 +290,23 @@ def process_spectra_group(coaddpath, catalog, model: DLAHolder, executor=None):
     # for each entry in passed catalog, fit spectrum with intrinsic model + N DLA
     wave = specobj.wave["brz"]
 
-    # lists shared with Allyson's finder
-    tidlist, ralist, declist, zqsolist, snrlist, dlaidlist = [], [], [], [], [], []
-    zlist, nhilist, zerrlist, nhierrlist, fitwarnlist = (
-        [],
-        [],
-        [],
-        [],
-        [],
-    )
-    # lists for GP-DLA results
-    pdlalist = []
-    pnulllist = []
-    logpdlalist = []
-    logpnulllist = []
-    modelplist = []
+    # fibermap row of each TARGETID, keeping the first row if repeated
+    tid_to_idx = {}
+    for i, tid in enumerate(specobj.fibermap["TARGETID"].tolist()):
+        tid_to_idx.setdefault(tid, i)
+
+    # rest wavelengths of the lines masked in BAL troughs, and which of them
+    # (Lya and NV) can produce false positive DLAs
+    bal_lams = np.array(list(constants.bal_lines.values()))
+    bal_lya_nv = np.isin(list(constants.bal_lines.keys()), ["Lya", "NV"])
+
+    # fit results, one row per detected DLA and at most model.max_dlas rows per
+    # target, written column-wise into preallocated arrays
+    max_n = model.max_dlas * len(catalog)
+    fitcolumns = {
+        name: np.empty(max_n, dtype=dtype) for name, dtype in FITRESULTS_COLUMNS
+    }
+    nrows = 0
 
     # set up results dict for GPDLA
     num_spectra = len(catalog)
@@ -308,8 +326,8 @@ def process_spectra_group(coaddpath, catalog, model: DLAHolder, executor=None):
         zqso = catalog["Z"][entry]
 
         try:
-            idx = np.nonzero(specobj.fibermap["TARGETID"] == tid)[0][0]
-        except:
+            idx = tid_to_idx[tid]
+        except KeyError:
             log.error(
                 f"Targetid {tid} NOT FOUND on healpix {catalog['HPXPIXEL'][entry]}"
             )
@@ -325,43 +343,56 @@ def process_spectra_group(coaddpath, catalog, model: DLAHolder, executor=None):
         # apply mask to BAL features, if available
         if "NCIV_450" in catalog.columns:
             nbal = catalog["NCIV_450"][entry]
-            bal_locs = []
-            for n in range(nbal):
-                # Compute velocity ranges
-                v_max = -catalog[entry]["VMAX_CIV_450"][n] / constants.c + 1.0
-                v_min = -catalog[entry]["VMIN_CIV_450"][n] / constants.c + 1.0
 
-                for line, lam in constants.bal_lines.items():
-                    # Mask wavelengths within the velocity ranges
-                    mask = np.logical_and(wave_rf > lam * v_max, wave_rf < lam * v_min)
-                    if (line == "Lya") or (line == "NV"):
-                        rededge = (lam * v_min) * (1 + zqso)
-                        blueedge = (lam * v_max) * (1 + zqso)
-                        bal_locs.append((rededge, blueedge))
+            # Compute velocity ranges, (nbal, )
+            v_max = -np.asarray(catalog[entry]["VMAX_CIV_450"][:nbal]) / constants.c
+            v_min = -np.asarray(catalog[entry]["VMIN_CIV_450"][:nbal]) / constants.c
 
-                    # Update pixel mask
-                    pixel_mask[mask] = True
+            # rest-frame window of each BAL line for each trough, (nbal, nlines)
+            bal_blue = bal_lams[None, :] * (v_max[:, None] + 1.0)
+            bal_red = bal_lams[None, :] * (v_min[:, None] + 1.0)
 
-                    ivar[mask] = 0
+            # Mask wavelengths within the velocity ranges, all windows in one pass
+            mask = np.any(
+                (wave_rf[None, :] > bal_blue.ravel()[:, None])
+                & (wave_rf[None, :] < bal_red.ravel()[:, None]),
+                axis=0,
+            )
 
-        # Convert inverse variance to variance
-        noise_variance = np.zeros(ivar.shape)
-        ind = ivar == 0
-        noise_variance[:] = np.nan
-        noise_variance[~ind] = 1 / ivar[~ind]
+            # Update pixel mask
+            pixel_mask[mask] = True
+
+            ivar[mask] = 0
+
+            # observed-frame (red edge, blue edge) of the Lya and NV windows
+            bal_locs = (
+                bal_red[:, bal_lya_nv].ravel() * (1 + zqso),
+                bal_blue[:, bal_lya_nv].ravel() * (1 + zqso),
+            )
 
         # This part set by Allyson, leave it as it is to match the final catalog filtering
         # only searching to rest frame 900 A (TODO: make this match GPDLA search range)
-        fitmask = wave_rf > constants.search_minlam
-        # limit our bestfit comparision w/ and w/o DLAs to search region of spectrum
-        searchmask = np.ma.masked_inside(
-            wave_rf[fitmask], constants.search_minlam, constants.search_maxlam
-        ).mask
-        # check if too much of the spectrum is masked
-        if np.sum(ivar[fitmask][searchmask] != 0) / np.sum(searchmask) < 0.2:
+        # limit our bestfit comparision w/ and w/o DLAs to search region of spectrum,
+        # search_minlam < wave_rf <= search_maxlam. wave is sorted, so the region is a
+        # contiguous slice and flux/ivar are indexed by views instead of boolean masks
+        searchslice = slice(
+            np.searchsorted(wave_rf, constants.search_minlam, side="right"),
+            np.searchsorted(wave_rf, constants.search_maxlam, side="right"),
+        )
+        ivar_search = ivar[searchslice]
+        flux_search = flux[searchslice]
+        # check if too much of the spectrum is masked, before any per-target
+        # work is spent on it
+        if np.sum(ivar_search != 0) / ivar_search.shape[0] < 0.2:
             log.warning(f"Targetid {tid} skipped - SEARCH WINDOW >80% MASKED")
             continue
 
+        # Convert inverse variance to variance
+        noise_variance = np.zeros(ivar.shape)
+        ind = ivar == 0
+        noise_variance[:] = np.nan
+        noise_variance[~ind] = 1 / ivar[~ind]
+
         # resample model to observed wave grid
         model.process_qso(
             entry,
@@ -402,40 +433,45 @@ def process_spectra_group(coaddpath, catalog, model: DLAHolder, executor=None):
         # false positive should only come from Lya and NV - all other lines too weak
         if ("nbal" in locals()) & np.any(zdla != -1):
             lam_center_dla = constants.Lya_line * (1 + zdla)
-            for window in bal_locs:
-                balflag = (lam_center_dla < window[0]) & (lam_center_dla > window[1])
-                fitwarn[balflag] |= DLAFLAG.POTENTIAL_BAL
-
-        ndla = np.sum(zdla != -1)
-        for n in range(ndla):
-            tidlist.append(tid)
-            dlaid = str(tid) + "00" + str(n)
-            dlaidlist.append(dlaid)
-            ralist.append(ra)
-            declist.append(dec)
-            zqsolist.append(zqso)
-
-            # DLA parameters
-            zlist.append(zdla[n])
-            zerrlist.append(zerr[n])
-            nhilist.append(nhi[n])
-            nhierrlist.append(nhierr[n])
-            fitwarnlist.append(fitwarn[n])
-            # average signal to noise in search region of unmasked pixels
-            mask = ivar[fitmask][searchmask] != 0
-            snr = np.mean(
-                (flux[fitmask][searchmask] * np.sqrt(ivar[fitmask][searchmask]))[mask]
+            rededges, blueedges = bal_locs
+            balflag = np.any(
+                (lam_center_dla[:, None] < rededges[None, :])
+                & (lam_center_dla[:, None] > blueedges[None, :]),
+                axis=1,
             )
-            snrlist.append(snr)
+            fitwarn[balflag] |= DLAFLAG.POTENTIAL_BAL
 
-            # GP-DLA results
-            pdlalist.append(p_dla)
-            pnulllist.append(p_no_dla)
-            logpdlalist.append(log_posteriors_dla[n])
-            logpnulllist.append(log_posteriors_no_dla)
-            modelplist.append(model_posteriors[2 + n])
+        # average signal to noise in search region of unmasked pixels
+        mask = ivar_search != 0
+        snr = np.mean((flux_search * np.sqrt(ivar_search))[mask])
 
-    if len(tidlist) == 0:
+        ndla = np.sum(zdla != -1)
+        rows = slice(nrows, nrows + ndla)
+
+        fitcolumns["TARGETID"][rows] = tid
+        fitcolumns["DLAID"][rows] = [str(tid) + "00" + str(n) for n in range(ndla)]
+        fitcolumns["RA"][rows] = ra
+        fitcolumns["DEC"][rows] = dec
+        fitcolumns["Z"][rows] = zqso
+
+        # DLA parameters
+        fitcolumns["Z_DLA"][rows] = zdla[:ndla]
+        fitcolumns["Z_DLA_ERR"][rows] = zerr[:ndla]
+        fitcolumns["NHI"][rows] = nhi[:ndla]
+        fitcolumns["NHI_ERR"][rows] = nhierr[:ndla]
+        fitcolumns["DLAFLAG"][rows] = fitwarn[:ndla]
+        fitcolumns["SNR"][rows] = snr
+
+        # GP-DLA results
+        fitcolumns["P_DLA"][rows] = p_dla
+        fitcolumns["P_NULL"][rows] = p_no_dla
+        fitcolumns["LOGP_DLA"][rows] = log_posteriors_dla[:ndla]
+        fitcolumns["LOGP_NULL"][rows] = log_posteriors_no_dla
+        fitcolumns["MODEL_P"][rows] = model_posteriors[2 : 2 + ndla]
+
+        nrows += ndla
+
+    if nrows == 0:
         # avoid vstack error for empty tables
         return ()
 
@@ -444,61 +480,7 @@ def process_spectra_group(coaddpath, catalog, model: DLAHolder, executor=None):
 
     # DLACAT create table of fit results
     fitresults = Table(
-        data=(
-            tidlist,
-            ralist,
-            declist,
-            zqsolist,
-            snrlist,
-            dlaidlist,
-            zlist,
-            zerrlist,
-            nhilist,
-            nhierrlist,
-            fitwarnlist,
-            # GP-DLA results
-            pdlalist,  # posterior probability of DLA model
-            pnulllist,  # posterior probability of no DLA model
-            logpdlalist,  # log posterior probability of DLA model
-            logpnulllist,  # log posterior probability of no DLA model
-            modelplist,  # model posterior probabilities
-        ),
-        names=[
-            "TARGETID",
-            "RA",
-            "DEC",
-            "Z",
-            "SNR",
-            "DLAID",
-            "Z_DLA",
-            "Z_DLA_ERR",
-            "NHI",
-            "NHI_ERR",
-            "DLAFLAG",
-            "P_DLA",
-            "P_NULL",
-            "LOGP_DLA",
-            "LOGP_NULL",
-            "MODEL_P",
-        ],
-        dtype=(
-            "int",
-            "float64",
-            "float64",
-            "float64",
-            "float64",
-            "str",
-            "float64",
-            "float64",
-            "float64",
-            "float64",
-            "int",
-            "float64",
-            "float64",
-            "float64",
-            "float64",
-            "float64",
-        ),
+        {name: column[:nrows] for name, column in fitcolumns.items()}, copy=False
     )
 
     return fitresults
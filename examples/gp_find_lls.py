@@ -156,20 +156,20 @@ class LLSGPDR12(DLAGP):
             broadening=broadening,
         )
 
-    def this_dla_gp(
-        self, z_lls: np.ndarray, nhis: np.ndarray
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def this_dla_absorption(
+        self, z_lls: np.ndarray, nhis: np.ndarray, cache_first: bool = True
+    ) -> np.ndarray:
         """
-        Compute the LLS GP model with k intervening LLS profiles onto
-        the mean and covariance.
+        Compute the total absorption of k intervening LLS profiles on the
+        unmasked pixels. DLAGP.this_dla_gp and the batched likelihood of
+        DLAGP.parallel_log_model_evidences both apply it onto the mean and
+        covariance.
 
-        :param z_dlas: (k_dlas, ), the redshifts of intervening DLAs
-        :param nhis: (k_dlas, ), the column densities of intervening DLAs
+        :param z_lls: (k_lls, ), the redshifts of intervening LLSs
+        :param nhis: (k_lls, ), the column densities of intervening LLSs
+        :param cache_first: unused, the LLS profiles are not cached
 
-        :return: (dla_mu, dla_M, dla_omega2)
-        :return dla_mu: (n_points, ), the GP mean model with k_dlas DLAs intervening.
-        :return dla_M: (n_points, k), the GP covariance with k_dlas DLAs intervening.
-        :return dla_omega2: (n_points), the absorption noise with k_dlas DLAs intervening.S
+        :return absorption: (n_points, ), the product of the k_lls absorption profiles.
 
         Note: the number of Voigt profile lines is controlled by self.params : Parameters,
         I prefer to not to allow users to change from the function arguments since that
@@ -217,11 +217,7 @@ class LLSGPDR12(DLAGP):
 
         assert len(absorption) == len(self.this_mu)
 
-        lls_mu = self.this_mu * absorption
-        lls_M = self.this_M * absorption[:, None]
-        lls_omega2 = self.this_omega2 * absorption**2
-
-        return lls_mu, lls_M, lls_omega2
+        return absorption
 
 
 class LyaSamples(DLASamples):
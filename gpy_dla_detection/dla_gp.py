@@ -5,6 +5,7 @@ A GP class for having multiple DLAs intervening in a given slightline.
 """
 
 from typing import Tuple, Optional, Callable, List
+import copy
 import os
 
 import concurrent.futures
@@ -15,20 +16,23 @@ from desiutil.log import log
 import numpy as np
 import scipy.stats as stats
 from scipy.integrate import quad
-import h5py
 
 from .set_parameters import Parameters
 from .model_priors import PriorCatalog
-from .null_gp import NullGP
+from .null_gp import NullGP, load_learned_model
 
-# Attempt to import VoigtProfile from voigt_fast, and fall back to voigt if it fails
+# Attempt to import VoigtProfile from voigt_fast, then the Numba kernel from
+# voigt_jit, and fall back to the pure Python voigt if both fail
 try:
     from .voigt_fast import VoigtProfile
 
     voigt_absorption = VoigtProfile().compute_voigt_profile
 # OSError, ImportError:
 except (OSError, ImportError):
-    from .voigt import voigt_absorption
+    try:
+        from .voigt_jit import voigt_absorption_nb as voigt_absorption
+    except ImportError:
+        from .voigt import voigt_absorption
 
 # this could be replaced to DLASamples in the future;
 # I import this is for the convenient of my autocomplete
@@ -37,63 +41,72 @@ from .dla_samples import DLASamplesMAT
 # Limit the number of workers to the number of CPU cores
 # max_workers = os.cpu_count() * 2
 
+# Maximum number of Voigt profiles cached by the model shared with the workers
+# of parallel_log_model_evidences, ~12 MB at 1500 pixels per profile
+WORKER_VOIGT_CACHE_SIZE = 1000
 
-def process_sample(
-    i: int,
-    num_dlas: int,
-    sample_z_dlas: np.ndarray,
-    base_sample_inds: np.ndarray,
-    dla_samples: DLASamplesMAT,
-    params: Parameters,
-    sample_log_likelihood_k_dlas: Callable[[np.ndarray, np.ndarray], float],
-    min_z_separation: float,
-) -> float:
+
+def use_process_pool() -> bool:
     """
-    Process a single sample by querying DLA parameters and computing the log likelihood.
+    Whether the QMC samples are evaluated in worker processes, i.e.
+    the environment variable GPDLA_EXECUTOR is set to "process".
+    """
+    return os.environ.get("GPDLA_EXECUTOR", "thread").lower() == "process"
+
 
-    This function retrieves the DLA parameters (redshift `z_dlas` and column density `logNHI`) for the
-    current sample. If `num_dlas` > 0, it retrieves additional parameters for multiple DLAs. Finally, it
-    computes the log likelihood of the k-DLA model for the given sample.
+def make_executor(
+    max_workers: Optional[int] = None,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+) -> concurrent.futures.Executor:
+    """
+    Create the executor used to evaluate the QMC samples in parallel.
+
+    The per-sample work (Voigt profiles and the low-rank Cholesky solve) runs
+    in NumPy/SciPy/Numba code that releases the GIL, so a thread pool is used
+    by default: threads share the model instead of pickling it for every batch.
+    Set the environment variable GPDLA_EXECUTOR=process to use worker processes.
 
     Args:
-        i (int): Index of the current sample.
-        num_dlas (int): Number of DLAs in the model for this sample.
-        sample_z_dlas (np.ndarray): Array of sampled redshift values for DLAs.
-        base_sample_inds (np.ndarray): Base indices to be resampled according to the prior.
-        dla_samples ('DLASamplesMAT'): Object containing the DLA sample catalog.
-        params ('Parameters'): Model parameters object.
-        sample_log_likelihood_k_dlas (Callable): Function to compute the log likelihood of k-DLA model.
-        min_z_separation (float): Minimum redshift separation for the DLA samples.
+        max_workers (int, optional): Maximum number of workers.
+        initializer (Callable, optional): Called once in each worker at start up.
+        initargs (tuple, optional): Arguments passed to the initializer.
 
     Returns:
-        float: The computed log likelihood for this sample.
+        concurrent.futures.Executor: ThreadPoolExecutor or ProcessPoolExecutor.
     """
+    if use_process_pool():
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=initializer, initargs=initargs
+        )
 
-    # Query the 1st DLA parameter {z_dla, logNHI}_{i=1} from the given DLA samples
-    z_dlas = np.array([sample_z_dlas[i]])
-    log_nhis = np.array([dla_samples.log_nhi_samples[i]])
-    nhis = np.array([dla_samples.nhi_samples[i]])
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, initializer=initializer, initargs=initargs
+    )
 
-    # Query the 2:k DLA parameters {z_dla, logNHI}_{i=2}^k_dlas
-    if num_dlas > 0:
-        base_ind = base_sample_inds[:num_dlas, i]
-        z_dlas_2_k = sample_z_dlas[base_ind]
-        log_nhis_2_k = dla_samples.log_nhi_samples[base_ind]
-        nhis_2_k = dla_samples.nhi_samples[base_ind]
 
-        # Append to samples to be applied on calculating the log likelihood
-        z_dlas = np.append(z_dlas, z_dlas_2_k)
-        log_nhis = np.append(log_nhis, log_nhis_2_k)
-        nhis = np.append(nhis, nhis_2_k)
+# The model of the spectrum being processed, set once per worker process by
+# init_worker when a process pool is created for a single spectrum
+_WORKER_GP = None
 
-        del z_dlas_2_k, log_nhis_2_k, nhis_2_k
 
-    # Compute the sample log likelihoods conditioned on k-DLAs
-    log_likelihood = sample_log_likelihood_k_dlas(z_dlas, nhis) - np.log(
-        params.num_dla_samples
-    )
+def init_worker(worker_gp: "DLAGP"):
+    """
+    Process pool initializer: keep the model in the worker, so the submitted
+    batches only carry the sample indices.
+    """
+    global _WORKER_GP
+    _WORKER_GP = worker_gp
+
 
-    return log_likelihood
+def worker_sample_log_likelihoods_k_dlas(
+    z_dlas: np.ndarray, nhis: np.ndarray
+) -> np.ndarray:
+    """
+    DLAGP.sample_log_likelihoods_k_dlas of the model set by init_worker.
+    Being a module-level function, it is pickled by reference.
+    """
+    return _WORKER_GP.sample_log_likelihoods_k_dlas(z_dlas, nhis)
 
 
 def process_batch(
@@ -103,12 +116,13 @@ def process_batch(
     base_sample_inds: np.ndarray,
     dla_samples: DLASamplesMAT,
     params: Parameters,
-    sample_log_likelihood_k_dlas: callable,
+    sample_log_likelihoods_k_dlas: callable,
     min_z_separation: float,  # Add min_z_separation as an argument
 ) -> List[float]:
     """
-    Process a batch of samples. For each sample in the batch, this function computes
-    the log likelihood using `process_sample` and returns the results as a list.
+    Process a batch of samples. The DLA parameters {z_dla, logNHI}_{i=1}^k of all
+    samples in the batch are gathered into (batch_size, num_dlas + 1) arrays, and
+    their log likelihoods are computed in one batched call.
 
     Args:
         batch_indices (List[int]): Indices of the samples in the batch.
@@ -117,30 +131,32 @@ def process_batch(
         base_sample_inds (np.ndarray): Base indices for resampling according to the prior.
         dla_samples ('DLASamplesMAT'): Object containing the DLA sample catalog.
         params ('Parameters'): Model parameters object.
-        sample_log_likelihood_k_dlas (callable): Function to compute log likelihood for each sample.
+        sample_log_likelihoods_k_dlas (callable): Function to compute the log likelihoods
+            of a batch of samples, e.g. DLAGP.sample_log_likelihoods_k_dlas.
         min_z_separation (float): Minimum redshift separation for DLA pairs.
 
     Returns:
         List[float]: List of log likelihoods for each sample in the batch.
     """
-    batch_results = []  # This will store the results for the entire batch
-
-    # Loop through each sample index in the batch and process it
-    for i in batch_indices:
-        # Process each sample using the same logic as process_sample
-        result = process_sample(
-            i,
-            num_dlas,
-            sample_z_dlas,
-            base_sample_inds,
-            dla_samples,
-            params,
-            sample_log_likelihood_k_dlas,
-            min_z_separation,  # Pass the missing argument
-        )
-        batch_results.append(result)  # Store the result in the batch result list
+    batch_indices = np.asarray(batch_indices)
+
+    # Query the 1st DLA parameter {z_dla, logNHI}_{i=1} from the given DLA samples
+    z_dlas = sample_z_dlas[batch_indices, None]
+    nhis = dla_samples.nhi_samples[batch_indices, None]
+
+    # Query the 2:k DLA parameters {z_dla, logNHI}_{i=2}^k_dlas
+    if num_dlas > 0:
+        base_ind = base_sample_inds[:num_dlas, batch_indices].T  # (batch, num_dlas)
+
+        z_dlas = np.concatenate([z_dlas, sample_z_dlas[base_ind]], axis=1)
+        nhis = np.concatenate([nhis, dla_samples.nhi_samples[base_ind]], axis=1)
+
+    # Compute the sample log likelihoods conditioned on k-DLAs
+    batch_results = sample_log_likelihoods_k_dlas(z_dlas, nhis) - np.log(
+        params.num_dla_samples
+    )
 
-    return batch_results  # Return the list of results for the batch
+    return list(batch_results)  # Return the list of results for the batch
 
 
 class DLAGP(NullGP):
@@ -206,8 +222,9 @@ class DLAGP(NullGP):
 
         self.broadening = broadening
 
-        # Initialize a cache for Voigt profiles
+        # Initialize a cache for Voigt profiles, unbounded if max_cached_profiles is None
         self.voigt_cache = {}
+        self.max_cached_profiles = None
 
     def log_model_evidences(self, max_dlas: int) -> np.ndarray:
         """
@@ -356,9 +373,10 @@ class DLAGP(NullGP):
         executor=None,
     ) -> np.ndarray:
         """
-        Parallelized version of the log model evidences computation using process-based parallelization.
+        Parallelized version of the log model evidences computation, evaluating batches of QMC samples concurrently.
 
-        This method computes the log likelihoods of the k-DLA models in parallel using `ProcessPoolExecutor`.
+        This method computes the log likelihoods of the k-DLA models in parallel using the executor
+        from `make_executor` (threads by default, processes if GPDLA_EXECUTOR=process).
         The process is repeated for each number of DLAs (up to `max_dlas`), and the results are stored
         in an array.
 
@@ -366,7 +384,7 @@ class DLAGP(NullGP):
             max_dlas (int): The maximum number of DLAs to be considered in the model.
             max_workers (int, optional): Maximum number of workers to use. Defaults to number of CPU cores * 2.
             batch_size (int, optional): Number of samples per batch. Defaults to 100.
-            executor (ProcessPoolExecutor, optional): An existing executor to reuse; if not provided, a new one is created.
+            executor (Executor, optional): An existing executor to reuse; if not provided, a new one is created.
 
         Returns:
             np.ndarray: Array containing the computed log likelihoods for 1 to `max_dlas` DLAs.
@@ -399,10 +417,26 @@ class DLAGP(NullGP):
             indices[i : i + batch_size] for i in range(0, len(indices), batch_size)
         ]
 
+        # Only ship what the workers need to evaluate the sample likelihoods,
+        # every submitted batch pickles its arguments separately
+        worker_gp = self.worker_payload()
+
+        sample_log_likelihoods_k_dlas = worker_gp.sample_log_likelihoods_k_dlas
+
         # Check if an executor is passed; if not, create one locally
         local_executor = False
         if executor is None:
-            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+            if use_process_pool():
+                # the pool only serves this spectrum: hand the model to each
+                # worker once at start up instead of with every batch
+                executor = make_executor(
+                    max_workers=max_workers,
+                    initializer=init_worker,
+                    initargs=(worker_gp,),
+                )
+                sample_log_likelihoods_k_dlas = worker_sample_log_likelihoods_k_dlas
+            else:
+                executor = make_executor(max_workers=max_workers)
             local_executor = True
 
         try:
@@ -415,9 +449,9 @@ class DLAGP(NullGP):
                         num_dlas,
                         sample_z_dlas,
                         base_sample_inds,
-                        self.dla_samples,
+                        worker_gp.dla_samples,
                         self.params,
-                        self.sample_log_likelihood_k_dlas,
+                        sample_log_likelihoods_k_dlas,
                         self.min_z_separation,
                     ): batch
                     for batch in batches
@@ -486,6 +520,42 @@ class DLAGP(NullGP):
 
         return log_likelihoods_dla
 
+    def worker_payload(self) -> "DLAGP":
+        """
+        A shallow copy of this model stripped down to what is needed for
+        evaluating self.sample_log_likelihoods_k_dlas in the executor workers.
+        With the default thread executor the copy is shared by the threads;
+        with GPDLA_EXECUTOR=process it is pickled to the worker processes.
+
+        The prior catalog, the learned model and its interpolants, and the
+        Voigt profile cache are dropped, so pickling the copy only carries
+        the data and the model interpolated onto it.
+
+        The copy starts an empty Voigt profile cache of at most
+        WORKER_VOIGT_CACHE_SIZE profiles. With the thread executor all workers
+        share it for the whole max_dlas loop, so it must not grow with the
+        number of QMC samples.
+        """
+        worker_gp = copy.copy(self)
+
+        worker_gp.prior = None
+        worker_gp.mu = None
+        worker_gp.M = None
+        worker_gp.log_omega = None
+        worker_gp.mu_interpolator = None
+        worker_gp.log_omega_interpolator = None
+        worker_gp.list_M_interpolators = None
+        worker_gp.voigt_cache = {}
+        worker_gp.max_cached_profiles = WORKER_VOIGT_CACHE_SIZE
+
+        # copy.copy goes through DLASamplesMAT.__getstate__/__setstate__, so the
+        # copy gets the sample arrays back from the load_dla_samples cache
+        # rather than from self.dla_samples; both refer to the same arrays
+        worker_gp.dla_samples = copy.copy(self.dla_samples)
+        worker_gp.dla_samples.prior = None
+
+        return worker_gp
+
     def sample_log_likelihood_k_dlas(
         self, z_dlas: np.ndarray, nhis: np.ndarray
     ) -> float:
@@ -508,6 +578,45 @@ class DLAGP(NullGP):
 
         return sample_log_likelihood
 
+    def sample_log_likelihoods_k_dlas(
+        self, z_dlas: np.ndarray, nhis: np.ndarray
+    ) -> np.ndarray:
+        """
+        Batched version of sample_log_likelihood_k_dlas: compute the log likelihoods
+        of k DLAs within a quasar spectrum for a batch of samples,
+            p(y | λ, σ², M, ω, c₀, τ₀, β, τ_kim, β_kim, {z_dla, logNHI}_{i=1}^k)
+
+        :param z_dlas: (num_samples, k_dlas), the z_dlas of each sample
+        :param nhis: (num_samples, k_dlas), the nhis of each sample
+
+        :return: (num_samples, ), the sample log likelihoods
+        """
+        assert z_dlas.shape == nhis.shape
+
+        # a subclass that overrides this_dla_gp instead of this_dla_absorption
+        # models more than the absorption: evaluate it one sample at a time
+        if type(self).this_dla_gp is not DLAGP.this_dla_gp:
+            return np.array(
+                [
+                    self.sample_log_likelihood_k_dlas(this_z_dlas, this_nhis)
+                    for this_z_dlas, this_nhis in zip(z_dlas, nhis)
+                ]
+            )
+
+        # only the 2:k DLAs, drawn from the resampled base_sample_inds, repeat
+        # across samples; the 1st DLA of every QMC sample is distinct, so it is
+        # not cached
+        absorption = np.stack(
+            [
+                self.this_dla_absorption(this_z_dlas, this_nhis, cache_first=False)
+                for this_z_dlas, this_nhis in zip(z_dlas, nhis)
+            ]
+        )
+
+        return self.log_mvnpdf_low_rank_batched(
+            self.y, self.this_mu, self.this_M, self.this_omega2, self.v, absorption
+        )
+
     def this_dla_gp(
         self, z_dlas: np.ndarray, nhis: np.ndarray
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
@@ -532,6 +641,31 @@ class DLAGP(NullGP):
         This would happen when a user want to know whether the result would converge with increasing
         number of lines.
         """
+        absorption = self.this_dla_absorption(z_dlas, nhis)
+
+        dla_mu = self.this_mu * absorption
+        dla_M = self.this_M * absorption[:, None]
+        dla_omega2 = self.this_omega2 * absorption**2
+
+        return dla_mu, dla_M, dla_omega2
+
+    def this_dla_absorption(
+        self, z_dlas: np.ndarray, nhis: np.ndarray, cache_first: bool = True
+    ) -> np.ndarray:
+        """
+        Compute the total absorption of k intervening DLA profiles on the
+        unmasked pixels, reusing cached Voigt profiles.
+
+        This is the method to override for a different absorber model (see
+        LLSGPDR12 in examples/gp_find_lls.py): both this_dla_gp and the batched
+        sample_log_likelihoods_k_dlas apply its absorption onto the GP.
+
+        :param z_dlas: (k_dlas, ), the redshifts of intervening DLAs
+        :param nhis: (k_dlas, ), the column densities of intervening DLAs
+        :param cache_first: whether to store the profile of the 1st DLA in the cache
+
+        :return absorption: (n_points, ), the product of the k_dlas absorption profiles.
+        """
         assert len(z_dlas) == len(nhis)
 
         k_dlas = len(z_dlas)
@@ -565,7 +699,11 @@ class DLAGP(NullGP):
                     nhi=nhis[j],
                     num_lines=self.params.num_lines,
                 )
-                self.voigt_cache[cache_key] = cached_absorption
+                if (j > 0 or cache_first) and (
+                    self.max_cached_profiles is None
+                    or len(self.voigt_cache) < self.max_cached_profiles
+                ):
+                    self.voigt_cache[cache_key] = cached_absorption
 
             # Multiply the absorption profiles for all DLAs
             absorption *= cached_absorption
@@ -574,11 +712,7 @@ class DLAGP(NullGP):
 
         assert len(absorption) == len(self.this_mu)
 
-        dla_mu = self.this_mu * absorption
-        dla_M = self.this_M * absorption[:, None]
-        dla_omega2 = self.this_omega2 * absorption**2
-
-        return dla_mu, dla_M, dla_omega2
+        return absorption
 
     def log_priors(self, z_qso: float, max_dlas: int) -> float:
         """
@@ -673,15 +807,15 @@ class DLAGPMAT(DLAGP):
         prev_tau_0: float = 0.0023,
         prev_beta: float = 3.65,
     ):
-        with h5py.File(learned_file, "r") as learned:
-
-            rest_wavelengths = learned["rest_wavelengths"][:, 0]
-            mu = learned["mu"][:, 0]
-            M = learned["M"][()].T
-            log_omega = learned["log_omega"][:, 0]
-            log_c_0 = learned["log_c_0"][0, 0]
-            log_tau_0 = learned["log_tau_0"][0, 0]
-            log_beta = learned["log_beta"][0, 0]
+        (
+            rest_wavelengths,
+            mu,
+            M,
+            log_omega,
+            log_c_0,
+            log_tau_0,
+            log_beta,
+        ) = load_learned_model(learned_file)
 
         super().__init__(
             params,
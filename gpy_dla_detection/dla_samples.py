@@ -3,6 +3,8 @@ A class to handle the QMC samples of the DLA parameters:
 theta = (z_dla, logNHI) = (redshift of DLA, column density of DLA)
 """
 
+from functools import lru_cache
+
 import numpy as np
 import scipy.stats as stats
 from scipy.integrate import quad
@@ -11,6 +13,32 @@ from .set_parameters import Parameters
 from .model_priors import PriorCatalog
 
 
+@lru_cache(maxsize=None)
+def load_dla_samples(dla_samples_file: str) -> dict:
+    """
+    Read the DLA samples from a .mat file generated from Roman's
+    generate_dla_samples.m.
+
+    The result is cached per process, so every DLASamplesMAT built from the
+    same file shares one read-only copy of the sample arrays. Loading it in
+    the parent before forking lets the workers share the pages as well.
+    """
+    with h5py.File(dla_samples_file, "r") as dla_samples:
+        samples = {
+            "alpha": dla_samples["alpha"][0, 0],
+            "uniform_min_log_nhi": dla_samples["uniform_min_log_nhi"][0, 0],
+            "uniform_max_log_nhi": dla_samples["uniform_max_log_nhi"][0, 0],
+            "offset_samples": dla_samples["offset_samples"][:, 0],
+            "log_nhi_samples": dla_samples["log_nhi_samples"][:, 0],
+            "nhi_samples": dla_samples["nhi_samples"][:, 0],
+        }
+
+    for key in ("offset_samples", "log_nhi_samples", "nhi_samples"):
+        samples[key].setflags(write=False)
+
+    return samples
+
+
 class DLASamples:
     """
     A class to generate and store the QMC samples for DLAs:
@@ -65,21 +93,40 @@ class DLASamplesMAT(DLASamples):
     ):
         super().__init__(params, prior)
 
-        dla_samples = h5py.File(dla_samples_file, "r")
+        self.dla_samples_file = dla_samples_file
+
+        dla_samples = load_dla_samples(dla_samples_file)
 
-        assert self.alpha == dla_samples["alpha"][0, 0]
-        assert self.uniform_min_log_nhi == dla_samples["uniform_min_log_nhi"][0, 0]
+        assert self.alpha == dla_samples["alpha"]
+        assert self.uniform_min_log_nhi == dla_samples["uniform_min_log_nhi"]
 
-        self._offset_samples = dla_samples["offset_samples"][:, 0]
-        self._log_nhi_samples = dla_samples["log_nhi_samples"][:, 0]
-        self._nhi_samples = dla_samples["nhi_samples"][:, 0]
+        self._offset_samples = dla_samples["offset_samples"]
+        self._log_nhi_samples = dla_samples["log_nhi_samples"]
+        self._nhi_samples = dla_samples["nhi_samples"]
 
-        self.uniform_min_log_nhi = dla_samples["uniform_min_log_nhi"][0, 0]
-        self.uniform_max_log_nhi = dla_samples["uniform_max_log_nhi"][0, 0]
+        self.uniform_min_log_nhi = dla_samples["uniform_min_log_nhi"]
+        self.uniform_max_log_nhi = dla_samples["uniform_max_log_nhi"]
 
         # # build the pdf function
         # self._pdf()
 
+    def __getstate__(self) -> dict:
+        # the QMC samples are reloaded from the sample file, which is read once
+        # per process, when unpickled; worker processes then do not receive
+        # them with every submitted task
+        state = self.__dict__.copy()
+        del state["_offset_samples"], state["_log_nhi_samples"], state["_nhi_samples"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+        dla_samples = load_dla_samples(self.dla_samples_file)
+
+        self._offset_samples = dla_samples["offset_samples"]
+        self._log_nhi_samples = dla_samples["log_nhi_samples"]
+        self._nhi_samples = dla_samples["nhi_samples"]
+
     @property
     def offset_samples(self) -> np.ndarray:
         return self._offset_samples
@@ -93,14 +140,9 @@ class DLASamplesMAT(DLASamples):
         return self._nhi_samples
 
     def sample_z_dlas(self, wavelengths: np.ndarray, z_qso: float) -> np.ndarray:
-        sample_z_dlas = (
-            self.params.min_z_dla(wavelengths, z_qso)
-            + (
-                self.params.max_z_dla(wavelengths, z_qso)
-                - self.params.min_z_dla(wavelengths, z_qso)
-            )
-            * self._offset_samples
-        )
+        min_z_dla, max_z_dla = self.params.z_dla_range(wavelengths, z_qso)
+
+        sample_z_dlas = min_z_dla + (max_z_dla - min_z_dla) * self._offset_samples
 
         return sample_z_dlas
 
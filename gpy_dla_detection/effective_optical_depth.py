@@ -45,36 +45,31 @@ def effective_optical_depth(
 
     # To count the effect of Lyman series from higher z,
     # we compute the absorbers' redshifts for all members of the series
-    this_lyseries_zs = np.empty((wavelengths.shape[0], num_forest_lines))
-    this_lyseries_zs[:] = np.nan
+    # at once: (n_points, num_forest_lines)
+    this_transition_wavelengths = transition_wavelengths[None, :num_forest_lines]
 
-    for i in range(num_forest_lines):
-        this_lyseries_zs[:, i] = (
-            wavelengths - transition_wavelengths[i]
-        ) / transition_wavelengths[i]
+    this_lyseries_zs = (
+        wavelengths[:, None] - this_transition_wavelengths
+    ) / this_transition_wavelengths
+
+    # calculate the oscillator strength for each lyman series member
+    this_tau_0 = (
+        tau_0
+        * oscillator_strengths[:num_forest_lines]
+        / lya_oscillator_strength
+        * transition_wavelengths[:num_forest_lines]
+        / lya_wavelength
+    )
 
     # Lyman series absorption effect on the mean-flux
     # apply the lya_absorption after the interpolation because NaN will appear in this_mu
-    total_optical_depth = np.empty((wavelengths.shape[0], num_forest_lines))
-    total_optical_depth[:] = np.nan
-
-    for i in range(num_forest_lines):
-        # calculate the oscillator strength for this lyman series member
-        this_tau_0 = (
-            tau_0
-            * oscillator_strengths[i]
-            / lya_oscillator_strength
-            * transition_wavelengths[i]
-            / lya_wavelength
-        )
-
-        total_optical_depth[:, i] = this_tau_0 * (1 + this_lyseries_zs[:, i]) ** beta
+    total_optical_depth = this_tau_0[None, :] * (1 + this_lyseries_zs) ** beta
 
-        # indicator function: z absorbers <= z_qso
-        # here is different from multi-dla processing script
-        # I choose to use zero instead or nan to indicate
-        # values outside of the Lyman forest
-        indicator = this_lyseries_zs[:, i] <= z_qso
-        total_optical_depth[:, i] = total_optical_depth[:, i] * indicator
+    # indicator function: z absorbers <= z_qso
+    # here is different from multi-dla processing script
+    # I choose to use zero instead or nan to indicate
+    # values outside of the Lyman forest
+    indicator = this_lyseries_zs <= z_qso
+    total_optical_depth = total_optical_depth * indicator
 
     return total_optical_depth
@@ -2,6 +2,9 @@
 A class to handle the Null model in Ho, Bird, Garnett (2020).
 """
 
+from functools import lru_cache
+from typing import Tuple
+
 import numpy as np
 import h5py
 import scipy
@@ -13,6 +16,35 @@ from .model_priors import PriorCatalog
 from .effective_optical_depth import effective_optical_depth
 
 
+@lru_cache(maxsize=None)
+def load_learned_model(
+    learned_file: str,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, float, float, float]:
+    """
+    Read the learned GP model from a .mat file.
+
+    The result is cached per process, so the Null, DLA, and subDLA models
+    built for every spectrum share a single copy of the learned arrays
+    instead of re-reading the file. The arrays are returned read-only.
+
+    :param learned_file: path to the learned model .mat file.
+    :return: (rest_wavelengths, mu, M, log_omega, log_c_0, log_tau_0, log_beta)
+    """
+    with h5py.File(learned_file, "r") as learned:
+        rest_wavelengths = learned["rest_wavelengths"][:, 0]
+        mu = learned["mu"][:, 0]
+        M = learned["M"][()].T
+        log_omega = learned["log_omega"][:, 0]
+        log_c_0 = learned["log_c_0"][0, 0]
+        log_tau_0 = learned["log_tau_0"][0, 0]
+        log_beta = learned["log_beta"][0, 0]
+
+    for array in (rest_wavelengths, mu, M, log_omega):
+        array.setflags(write=False)
+
+    return rest_wavelengths, mu, M, log_omega, log_c_0, log_tau_0, log_beta
+
+
 class NullGP:
     """
     Null GP model for QSO emission:
@@ -342,17 +374,15 @@ class NullGP:
         B.ravel()[0 :: (k + 1)] = B.ravel()[0 :: (k + 1)] + 1
         # numpy cholesky returns lower triangle, different than MATLAB's upper triangle
         L = np.linalg.cholesky(B)
-        # C = B^-1 M' D^-1
+        # B^-1 M' D^-1 y, solved on the (k, 1) right-hand side with the Cholesky
+        # factor rather than forming C = B^-1 M' D^-1, which is (k, n_points)
+        M_D_inv_y = np.matmul(M.T, D_inv_y)  # (k, 1)
         if scipy_lapack:
-            tmp = np.matmul(lapack.dtrtri(np.asfortranarray(L), lower=1)[0], D_inv_M.T)
-            C = np.matmul(lapack.dtrtri(np.asfortranarray(L.T), lower=0)[0], tmp)
+            B_inv_M_D_inv_y = lapack.dpotrs(L, M_D_inv_y, lower=1)[0]
         else:
-            tmp = scipy.linalg.solve_triangular(
-                L, D_inv_M.T, lower=True
-            )  # (k, n_points)
-            C = scipy.linalg.solve_triangular(L.T, tmp, lower=False)  # (k, n_points)
+            B_inv_M_D_inv_y = scipy.linalg.cho_solve((L, True), M_D_inv_y)
 
-        K_inv_y = D_inv_y - np.matmul(D_inv_M, np.matmul(C, y))  # (n_points, 1)
+        K_inv_y = D_inv_y - np.matmul(D_inv_M, B_inv_M_D_inv_y)  # (n_points, 1)
 
         log_det_K = np.sum(np.log(d)) + 2 * np.sum(np.log(np.diag(L)))
 
@@ -360,6 +390,69 @@ class NullGP:
 
         return log_p
 
+    @staticmethod
+    def log_mvnpdf_low_rank_batched(
+        y: np.ndarray,
+        mu: np.ndarray,
+        M: np.ndarray,
+        omega2: np.ndarray,
+        v: np.ndarray,
+        absorption: np.ndarray,
+    ) -> np.ndarray:
+        """
+        efficiently computes, for a stack of absorption profiles a_s,
+
+           log N(y; mu .* a_s, A_s (MM' + diag(omega2)) A_s + diag(v)),  A_s = diag(a_s)
+
+        which is log_mvnpdf_low_rank(y, mu * a_s, M * a_s[:, None], omega2 * a_s**2 + v)
+        for every s, but with the (k, k) Woodbury matrices of all samples built
+        by a single matrix product.
+
+        :param y: this_flux, (n_points, )
+        :param mu: this_mu, the mean vector of GP, (n_points, )
+        :param M: this_M, the low rank decomposition of covariance matrix, (n_points, k)
+        :param omega2: this_omega2, the absorption noise, (n_points, )
+        :param v: instrumental noise variance, (n_points, )
+        :param absorption: absorption profiles, (num_samples, n_points)
+        :return log_p: (num_samples, )
+        """
+        log_2pi = 1.83787706640934534
+
+        n, k = M.shape
+
+        d = omega2[None, :] * absorption**2 + v[None, :]  # (num_samples, n_points)
+        y = y[None, :] - mu[None, :] * absorption  # (num_samples, n_points)
+
+        D_inv_y = y / d
+
+        # B_s = I + M' A_s D_s^-1 A_s M for all samples at once:
+        # (num_samples, n_points) * (n_points, k * k) -> (num_samples, k, k)
+        M_outer = (M[:, :, None] * M[:, None, :]).reshape(n, k * k)
+        B = np.matmul(absorption**2 / d, M_outer).reshape(-1, k, k)
+        B[:, np.arange(k), np.arange(k)] += 1
+        L = np.linalg.cholesky(B)
+
+        # M' A_s D_s^-1 y_s, (num_samples, k)
+        M_D_inv_y = np.matmul(absorption * D_inv_y, M)
+
+        # solve B_s x = M' A_s D_s^-1 y_s with the Cholesky factors, (L L')^-1
+        B_inv_M_D_inv_y = np.stack(
+            [lapack.dpotrs(L_s, b_s, lower=1)[0] for L_s, b_s in zip(L, M_D_inv_y)]
+        )
+
+        # y' K^-1 y by Woodbury identity
+        y_K_inv_y = np.sum(y * D_inv_y, axis=1) - np.sum(
+            M_D_inv_y * B_inv_M_D_inv_y, axis=1
+        )
+
+        log_det_K = np.sum(np.log(d), axis=1) + 2 * np.sum(
+            np.log(np.diagonal(L, axis1=1, axis2=2)), axis=1
+        )
+
+        log_p = -0.5 * (y_K_inv_y + log_det_K + n * log_2pi)
+
+        return log_p
+
     def log_prior(self, z_qso: float, without_subDLAs: bool = True) -> float:
         """
         get the model prior of null model, this is defined to be:
@@ -401,14 +494,15 @@ class NullGPMAT(NullGP):
         prev_tau_0: float = 0.0023,
         prev_beta: float = 3.65,
     ):
-        with h5py.File(learned_file, "r") as learned:
-            rest_wavelengths = learned["rest_wavelengths"][:, 0]
-            mu = learned["mu"][:, 0]
-            M = learned["M"][()].T
-            log_omega = learned["log_omega"][:, 0]
-            log_c_0 = learned["log_c_0"][0, 0]
-            log_tau_0 = learned["log_tau_0"][0, 0]
-            log_beta = learned["log_beta"][0, 0]
+        (
+            rest_wavelengths,
+            mu,
+            M,
+            log_omega,
+            log_c_0,
+            log_tau_0,
+            log_beta,
+        ) = load_learned_model(learned_file)
 
         super().__init__(
             params,
@@ -8,6 +8,8 @@ Physical constants are handled as class attrs
 Pipeline parameters are handled as instance attrs
 Lambda functions are handled as instance methods
 """
+from typing import Tuple
+
 import numpy as np
 
 
@@ -122,22 +124,42 @@ class Parameters:
         """
         return emitted_wavelengths * (1 + z)
 
-    def max_z_dla(self, wavelengths: np.ndarray, z_qso: float) -> float:
+    def z_dla_range(self, wavelengths: np.ndarray, z_qso: float) -> Tuple[float, float]:
         """
-        determines maximum z_DLA to search
+        determines (minimum z_DLA, maximum z_DLA) to search
 
-        We only consider z_dla within the modelling range.
+        We only consider z_dla within the modelling range. Both bounds share
+        the same modelling-range mask, so compute it once.
         """
         rest_wavelengths = self.emitted_wavelengths(wavelengths, z_qso)
         ind = (rest_wavelengths >= self.min_lambda) & (
             rest_wavelengths <= self.max_lambda
         )
-        return np.min(
+        this_wavelengths = wavelengths[ind]
+
+        min_z_dla = np.max(
+            [
+                np.min(this_wavelengths) / self.lya_wavelength - 1,
+                self.observed_wavelengths(self.lyman_limit, z_qso) / self.lya_wavelength
+                - 1
+                + self.min_z_cut,
+            ]
+        )
+        max_z_dla = np.min(
             [
-                (np.max(wavelengths[ind]) / self.lya_wavelength - 1) - self.max_z_cut,
+                (np.max(this_wavelengths) / self.lya_wavelength - 1) - self.max_z_cut,
                 z_qso                                                - self.max_z_cut
             ]
         )
+        return min_z_dla, max_z_dla
+
+    def max_z_dla(self, wavelengths: np.ndarray, z_qso: float) -> float:
+        """
+        determines maximum z_DLA to search
+
+        We only consider z_dla within the modelling range.
+        """
+        return self.z_dla_range(wavelengths, z_qso)[1]
 
     def min_z_dla(self, wavelengths: np.ndarray, z_qso: float) -> float:
         """
@@ -145,18 +167,7 @@ class Parameters:
 
         We only consider z_dla within the modelling range.
         """
-        rest_wavelengths = self.emitted_wavelengths(wavelengths, z_qso)
-        ind = (rest_wavelengths >= self.min_lambda) & (
-            rest_wavelengths <= self.max_lambda
-        )
-        return np.max(
-            [
-                np.min(wavelengths[ind]) / self.lya_wavelength - 1,
-                self.observed_wavelengths(self.lyman_limit, z_qso) / self.lya_wavelength
-                - 1
-                + self.min_z_cut,
-            ]
-        )
+        return self.z_dla_range(wavelengths, z_qso)[0]
 
     def __repr__(self):
         """
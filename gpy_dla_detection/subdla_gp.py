@@ -8,19 +8,24 @@ in .dla_gp.DLAGP, I chose to inherent from .null_gp.NullGP.
 
 from typing import Tuple, Optional
 import numpy as np
-import h5py
 
 from .set_parameters import Parameters
 from .model_priors import PriorCatalog
 from .dla_gp import DLAGP
+from .null_gp import load_learned_model
 
-# Attempt to import VoigtProfile from voigt_fast, and fall back to voigt if it fails
+# Attempt to import VoigtProfile from voigt_fast, then the Numba kernel from
+# voigt_jit, and fall back to the pure Python voigt if both fail
 try:
     from .voigt_fast import VoigtProfile
 
     voigt_absorption = VoigtProfile().compute_voigt_profile
-except ImportError:
-    from .voigt import voigt_absorption
+# OSError, ImportError:
+except (OSError, ImportError):
+    try:
+        from .voigt_jit import voigt_absorption_nb as voigt_absorption
+    except ImportError:
+        from .voigt import voigt_absorption
 
 from .subdla_samples import SubDLASamplesMAT  # for convenient autocomplete
 
@@ -146,14 +151,15 @@ class SubDLAGPMAT(SubDLAGP):
         prev_beta: float = 3.65,
     ):
         # Load the learned model from the .mat file
-        with h5py.File(learned_file, "r") as learned:
-            rest_wavelengths = learned["rest_wavelengths"][:, 0]
-            mu = learned["mu"][:, 0]
-            M = learned["M"][()].T
-            log_omega = learned["log_omega"][:, 0]
-            log_c_0 = learned["log_c_0"][0, 0]
-            log_tau_0 = learned["log_tau_0"][0, 0]
-            log_beta = learned["log_beta"][0, 0]
+        (
+            rest_wavelengths,
+            mu,
+            M,
+            log_omega,
+            log_c_0,
+            log_tau_0,
+            log_beta,
+        ) = load_learned_model(learned_file)
 
         # Initialize the SubDLAGP class explicitly with all parameters
         super().__init__(
@@ -3,6 +3,8 @@ subdla_samples.py : generate the Quasi-Monte Carlo samples for
 calculating log model evidence of subDLA model
 """
 
+from functools import lru_cache
+
 import numpy as np
 import h5py
 from .set_parameters import Parameters
@@ -10,6 +12,33 @@ from .model_priors import PriorCatalog
 from .dla_samples import DLASamples
 
 
+@lru_cache(maxsize=None)
+def load_subdla_samples(sub_dla_samples_file: str) -> dict:
+    """
+    Read the subDLA samples from a .mat file generated from Ho-Bird-Garnett's
+    multi_dlas/set_lls_parameters.m.
+
+    Cached per process like dla_samples.load_dla_samples; the sample arrays
+    are returned read-only.
+    """
+    with h5py.File(sub_dla_samples_file, "r") as sub_dla_samples:
+        samples = {
+            "extrapolate_min_log_nhi": sub_dla_samples["extrapolate_min_log_nhi"][0, 0],
+            "alpha": sub_dla_samples["alpha"][0, 0],
+            "num_dla_samples": sub_dla_samples["num_dla_samples"][0, 0],
+            "offset_samples": sub_dla_samples["offset_samples"][:, 0],
+            "log_nhi_samples": sub_dla_samples["lls_log_nhi_samples"][:, 0],
+            "nhi_samples": sub_dla_samples["lls_nhi_samples"][:, 0],
+            "Z_dla": sub_dla_samples["Z_dla"][0, 0],
+            "Z_lls": sub_dla_samples["Z_lls"][0, 0],
+        }
+
+    for key in ("offset_samples", "log_nhi_samples", "nhi_samples"):
+        samples[key].setflags(write=False)
+
+    return samples
+
+
 class SubDLASamples(DLASamples):
     """
     A class to generate and store the QMC samples for DLAs:
@@ -76,22 +105,39 @@ class SubDLASamplesMAT(SubDLASamples):
         prior: PriorCatalog,
         sub_dla_samples_file: str = "subdla_samples.mat",
     ):
-        sub_dla_samples = h5py.File(sub_dla_samples_file, "r")
+        self.sub_dla_samples_file = sub_dla_samples_file
+
+        sub_dla_samples = load_subdla_samples(sub_dla_samples_file)
 
-        super().__init__(
-            params, prior, sub_dla_samples["extrapolate_min_log_nhi"][0, 0]
-        )
+        super().__init__(params, prior, sub_dla_samples["extrapolate_min_log_nhi"])
 
-        assert self.alpha == sub_dla_samples["alpha"][0, 0]
-        assert self.num_dla_samples == sub_dla_samples["num_dla_samples"][0, 0]
+        assert self.alpha == sub_dla_samples["alpha"]
+        assert self.num_dla_samples == sub_dla_samples["num_dla_samples"]
 
-        self._offset_samples = sub_dla_samples["offset_samples"][:, 0]
-        self._log_nhi_samples = sub_dla_samples["lls_log_nhi_samples"][:, 0]
-        self._nhi_samples = sub_dla_samples["lls_nhi_samples"][:, 0]
+        self._offset_samples = sub_dla_samples["offset_samples"]
+        self._log_nhi_samples = sub_dla_samples["log_nhi_samples"]
+        self._nhi_samples = sub_dla_samples["nhi_samples"]
 
         # load normalization factors (partition functions)
-        self._Z_dla = sub_dla_samples["Z_dla"][0, 0]
-        self._Z_lls = sub_dla_samples["Z_lls"][0, 0]
+        self._Z_dla = sub_dla_samples["Z_dla"]
+        self._Z_lls = sub_dla_samples["Z_lls"]
+
+    def __getstate__(self) -> dict:
+        # the QMC samples are reloaded from the sample file, which is read once
+        # per process, when unpickled; worker processes then do not receive
+        # them with every submitted task
+        state = self.__dict__.copy()
+        del state["_offset_samples"], state["_log_nhi_samples"], state["_nhi_samples"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+        sub_dla_samples = load_subdla_samples(self.sub_dla_samples_file)
+
+        self._offset_samples = sub_dla_samples["offset_samples"]
+        self._log_nhi_samples = sub_dla_samples["log_nhi_samples"]
+        self._nhi_samples = sub_dla_samples["nhi_samples"]
 
     @property
     def Z_dla(self) -> float:
@@ -114,14 +160,9 @@ class SubDLASamplesMAT(SubDLASamples):
         return self._nhi_samples
 
     def sample_z_lls(self, wavelengths: np.ndarray, z_qso: float) -> np.ndarray:
-        sample_z_lls = (
-            self.params.min_z_dla(wavelengths, z_qso)
-            + (
-                self.params.max_z_dla(wavelengths, z_qso)
-                - self.params.min_z_dla(wavelengths, z_qso)
-            )
-            * self._offset_samples
-        )
+        min_z_dla, max_z_dla = self.params.z_dla_range(wavelengths, z_qso)
+
+        sample_z_lls = min_z_dla + (max_z_dla - min_z_dla) * self._offset_samples
 
         return sample_z_lls
 
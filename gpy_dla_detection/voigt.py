@@ -11,6 +11,9 @@ I keep the variables of Lyman series in this file to
 reflect the same structure as Roman's code, but they
 could be moved to set_parameters.py in the future.
 """
+import threading
+from typing import Tuple
+
 import numpy as np
 from scipy.special import wofz
 
@@ -248,6 +251,58 @@ def Voigt(x: np.ndarray, sigma: float, gamma: float) -> np.ndarray:
     return np.real(wofz(z)) / (np.sqrt(2 * np.pi) * sigma)
 
 
+# per-thread scratch buffers for the Faddeeva function, reused across calls
+# with the same (num_lines, num_points)
+_wofz_buffers = threading.local()
+
+
+def wofz_buffers(num_lines: int, num_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Preallocated complex128 (num_lines, num_points) arrays for the argument
+    and the output of wofz. Only the buffers of the last shape are kept, and
+    each thread gets its own pair, so the executor threads never share them.
+    """
+    shape = (num_lines, num_points)
+
+    if getattr(_wofz_buffers, "shape", None) != shape:
+        _wofz_buffers.shape = shape
+        _wofz_buffers.z = np.empty(shape, dtype=np.complex128)
+        _wofz_buffers.w = np.empty(shape, dtype=np.complex128)
+
+    return _wofz_buffers.z, _wofz_buffers.w
+
+
+def _voigt_sum(wavelengths: np.ndarray, z_dla: float, num_lines: int) -> np.ndarray:
+    """
+    S(wavelengths) = sum_j - leading_constants[j] * Voigt(velocity, sigma, gammas[j])
+    for the first num_lines Lyman series lines, so that the raw profile of
+    column density nhi is exp( nhi * S ).
+    """
+    num_points = wavelengths.shape[0]
+
+    # inverse of the observed line centres (Å⁻¹) for the relative velocity,
+    # written as c * (λ / λ_ref - 1) to avoid subtracting two numbers ~ c
+    inv_ref = 1.0 / (transition_wavelengths[:num_lines] * (1 + z_dla) * 1e8)
+
+    # compute raw Voigt profile for all lines at once: (num_lines, num_points),
+    # z = (velocity + i gamma) / (sqrt(2) sigma) written into reused buffers
+    z, w = wofz_buffers(num_lines, num_points)
+
+    np.multiply(wavelengths[None, :], inv_ref[:, None], out=z.real)
+    z.real -= 1.0
+    z.real *= c / (np.sqrt(2) * sigma)
+    z.imag = gammas[:num_lines, None] / (np.sqrt(2) * sigma)
+
+    wofz(z, out=w)
+
+    # sum over lines of - leading_constants[j] * Voigt(velocity, sigma, gammas[j])
+    total = np.dot(
+        -leading_constants[:num_lines] / (np.sqrt(2 * np.pi) * sigma), w.real
+    )
+
+    return total
+
+
 def voigt_absorption(
     wavelengths: np.ndarray,
     nhi: float,
@@ -292,21 +347,16 @@ def voigt_absorption(
     # absorption profile : dimensionless
     profile = np.zeros((num_points - 2 * width))
 
-    # raw_profile before convolve with the instrumental profile
-    raw_profile = np.empty((num_points,))
-
-    # build the multipliers for the relative velocity
-    multipliers = c / (transition_wavelengths[:num_lines] * (1 + z_dla)) / 1e8
-
-    # compute raw Voigt profile
-    total = np.empty((num_lines, raw_profile.shape[0]))
+    # the nhi-independent part of the exponent
+    total = _voigt_sum(wavelengths, z_dla, num_lines)
 
-    for l in range(num_lines):
-        velocity = wavelengths * multipliers[l] - c
-
-        total[l, :] = -leading_constants[l] * Voigt(velocity, sigma, gammas[l])
-
-    raw_profile[:] = np.exp(np.float64(nhi) * np.nansum(total, axis=0))
+    # raw_profile before convolve with the instrumental profile
+    # exp is evaluated on every pixel: the damping wings keep nhi * total well
+    # away from 0 across the spectrum and only the line cores saturate, so
+    # masking out the saturated pixels costs more than the exp it saves.
+    # The profile stays in float64, since the GP likelihood multiplies it into
+    # the mean and the low-rank covariance before a Cholesky solve.
+    raw_profile = np.exp(float(nhi) * total)
 
     if broadening:
         # num_points = len(profile)
@@ -316,7 +366,18 @@ def voigt_absorption(
         #     for k,j in enumerate(range(i, i + 2 * width + 1)):
         #         profile[i] += raw_profile[j] * instrument_profile[k]
         # return  profile
-        profile[:] = np.convolve(raw_profile, instrument_profile, "valid")
+        # unrolled 7-tap stencil, equivalent to
+        #   np.convolve(raw_profile, instrument_profile, "valid")
+        # the instrumental profile is symmetric, so pair the taps to halve
+        # the number of multiplications
+        ip = instrument_profile
+        n = num_points
+        profile[:] = (
+            ip[3] * raw_profile[3 : n - 3]
+            + ip[2] * (raw_profile[2 : n - 4] + raw_profile[4 : n - 2])
+            + ip[1] * (raw_profile[1 : n - 5] + raw_profile[5 : n - 1])
+            + ip[0] * (raw_profile[0 : n - 6] + raw_profile[6:n])
+        )
         return profile
 
     return raw_profile
@@ -110,10 +110,19 @@ def process_single_spectrum(
         Executor object for parallel processing.
     """
     # Set data for the Null, DLA, and Sub-DLA models
-    for model, name in zip([gp, dla_gp, subdla_gp], ["Null", "DLA", "Sub-DLA"]):
+    gp.set_data(
+        rest_wavelengths, flux, noise_variance, pixel_mask, z_qso, build_model=True
+    )
+    # The DLA and Sub-DLA models share the learned model and mean-flux
+    # suppression with the Null model, so reuse its interpolated model
+    # instead of re-interpolating it onto the same spectrum.
+    for model in [dla_gp, subdla_gp]:
         model.set_data(
-            rest_wavelengths, flux, noise_variance, pixel_mask, z_qso, build_model=True
+            rest_wavelengths, flux, noise_variance, pixel_mask, z_qso, build_model=False
         )
+        model.this_mu = gp.this_mu
+        model.this_M = gp.this_M
+        model.this_omega2 = gp.this_omega2
 
     # Run Bayesian model selection with parallelized model evidence computation
     bayes.model_selection(
@@ -127,8 +136,9 @@ def process_single_spectrum(
     # Store basic results
     results["z_qsos"][idx] = z_qso
     results["target_ids"][idx] = target_id
-    results["min_z_dlas"][idx] = dla_gp.params.min_z_dla(wavelengths, z_qso)
-    results["max_z_dlas"][idx] = dla_gp.params.max_z_dla(wavelengths, z_qso)
+    results["min_z_dlas"][idx], results["max_z_dlas"][idx] = (
+        dla_gp.params.z_dla_range(wavelengths, z_qso)
+    )
     results["log_priors_no_dla"][idx] = bayes.log_priors[0]
     results["log_priors_dla"][idx, :] = bayes.log_priors[-max_dlas:]
     results["log_likelihoods_no_dla"][idx] = bayes.log_likelihoods[0]
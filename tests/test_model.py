@@ -4,6 +4,7 @@ test_model.py : test the functions related to GP model
 import os
 import time
 import numpy as np
+import h5py
 from matplotlib import pyplot as plt
 from scipy.stats import multivariate_normal
 from gpy_dla_detection.effective_optical_depth import effective_optical_depth
@@ -12,7 +13,7 @@ from gpy_dla_detection.set_parameters import Parameters
 from gpy_dla_detection.model_priors import PriorCatalog
 
 from gpy_dla_detection.null_gp import NullGPMAT, NullGP
-from gpy_dla_detection.dla_gp import DLAGPMAT
+from gpy_dla_detection.dla_gp import DLAGPMAT, DLAGP
 from gpy_dla_detection.subdla_gp import SubDLAGPMAT
 
 from gpy_dla_detection.read_spec import read_spec, retrieve_raw_spec
@@ -72,6 +73,94 @@ def test_log_mvnpdf():
     assert np.abs(log_p - np.log(rv.pdf(y))) < 1e-4
 
 
+def test_log_mvnpdf_batched():
+    rng = np.random.default_rng(0)
+
+    n, k, num_samples = 200, 5, 10
+
+    y = rng.normal(size=n)
+    mu = 1 + rng.random(n)
+    M = 0.1 * rng.normal(size=(n, k))
+    omega2 = 0.1 * rng.random(n)
+    v = 0.01 + 0.1 * rng.random(n)
+
+    # random absorption profiles, one per sample
+    absorption = rng.random((num_samples, n))
+
+    log_p = NullGP.log_mvnpdf_low_rank_batched(y, mu, M, omega2, v, absorption)
+
+    assert log_p.shape == (num_samples,)
+
+    for a, this_log_p in zip(absorption, log_p):
+        log_p_single = NullGP.log_mvnpdf_low_rank(
+            y, mu * a, M * a[:, None], omega2 * a**2 + v
+        )
+        assert np.abs(this_log_p - log_p_single) < 1e-8
+
+
+def test_parallel_log_model_evidences(tmp_path):
+    rng = np.random.default_rng(0)
+
+    params = Parameters(num_dla_samples=200)
+
+    # QMC samples in the format of Roman's generate_dla_samples.m
+    dla_samples_file = str(tmp_path / "dla_samples.mat")
+    log_nhi_samples = rng.uniform(20, 22, (params.num_dla_samples, 1))
+    with h5py.File(dla_samples_file, "w") as f:
+        f["alpha"] = np.array([[params.alpha]])
+        f["uniform_min_log_nhi"] = np.array([[params.uniform_min_log_nhi]])
+        f["uniform_max_log_nhi"] = np.array([[params.uniform_max_log_nhi]])
+        f["offset_samples"] = rng.random((params.num_dla_samples, 1))
+        f["log_nhi_samples"] = log_nhi_samples
+        f["nhi_samples"] = 10**log_nhi_samples
+
+    dla_samples = DLASamplesMAT(params, None, dla_samples_file)
+
+    # a synthetic learned model and spectrum
+    rest_wavelengths = np.linspace(params.min_lambda, params.max_lambda, 400)
+    mu = 1 + 0.1 * np.sin(rest_wavelengths / 10)
+    M = 0.05 * rng.normal(size=(rest_wavelengths.shape[0], params.k))
+    log_omega = np.log(0.1) * np.ones(rest_wavelengths.shape)
+
+    z_qso = 3
+    X = np.linspace(params.min_lambda, params.normalization_max_lambda + 5, 500)
+    Y = np.interp(X, rest_wavelengths, mu) + 0.05 * rng.normal(size=X.shape)
+    noise_variance = 0.05**2 * np.ones(X.shape)
+    pixel_mask = np.zeros(X.shape, dtype=bool)
+
+    # a subclass overriding this_dla_gp, which the batched likelihood can't use
+    class ScaledDLAGP(DLAGP):
+        def this_dla_gp(self, z_dlas, nhis):
+            dla_mu, dla_M, dla_omega2 = super().this_dla_gp(z_dlas, nhis)
+            return 0.9 * dla_mu, dla_M, dla_omega2
+
+    for gp_class in (DLAGP, ScaledDLAGP):
+        dla_gp = gp_class(
+            params,
+            None,
+            dla_samples,
+            rest_wavelengths,
+            mu,
+            M,
+            log_omega,
+            np.log(0.01),
+            np.log(0.002),
+            np.log(3.6),
+        )
+        dla_gp.set_data(X, Y, noise_variance, pixel_mask, z_qso=z_qso)
+
+        # the serial and the parallel evidences resample the same way
+        np.random.seed(0)
+        log_likelihoods_dla = dla_gp.log_model_evidences(max_dlas=2)
+
+        np.random.seed(0)
+        parallel_log_likelihoods_dla = dla_gp.parallel_log_model_evidences(
+            max_dlas=2, max_workers=2, batch_size=50
+        )
+
+        assert np.allclose(log_likelihoods_dla, parallel_log_likelihoods_dla, rtol=1e-8)
+
+
 def test_log_likelihood_no_dla():
     # test 1
     filename = "spec-5309-55929-0362.fits"
@@ -1,6 +1,7 @@
 """
 Test set_parameters
 """
+import numpy as np
 from gpy_dla_detection.set_parameters import Parameters
 
 
@@ -24,3 +25,18 @@ def test_values():
         )
         < 1e-4
     )
+
+
+def test_z_dla_range():
+    parameters = Parameters()
+
+    z_qso = 3
+    wavelengths = parameters.observed_wavelengths(
+        parameters.min_lambda + 0.25 * np.arange(2000), z_qso
+    )
+
+    min_z_dla, max_z_dla = parameters.z_dla_range(wavelengths, z_qso)
+
+    assert min_z_dla == parameters.min_z_dla(wavelengths, z_qso)
+    assert max_z_dla == parameters.max_z_dla(wavelengths, z_qso)
+    assert min_z_dla < max_z_dla < z_qso
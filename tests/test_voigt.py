@@ -55,3 +55,120 @@ def test_instrumental_broadening():
     profile_numpy = np.convolve(raw_profile, instrument_profile, "valid")
 
     assert np.all(np.abs(profile - profile_numpy) < 1e-4)
+
+
+def test_vectorized_lines():
+    """
+    The vectorized Voigt profile should match summing over the Lyman
+    series one line at a time.
+    """
+    from gpy_dla_detection.voigt import (
+        Voigt,
+        c,
+        sigma,
+        gammas,
+        leading_constants,
+        transition_wavelengths,
+    )
+
+    z_qso = 3.15
+    wavelengths = np.linspace(911, 1216, 1000) * (1 + z_qso)
+
+    z_dla = 3.1
+    nhi = 10 ** 20.3
+    num_lines = 5
+
+    raw_profile = voigt_absorption(
+        wavelengths, nhi, z_dla, num_lines=num_lines, broadening=False
+    )
+
+    # line-by-line sum as in Roman's code
+    multipliers = c / (transition_wavelengths[:num_lines] * (1 + z_dla)) / 1e8
+    total = np.zeros(wavelengths.shape)
+    for l in range(num_lines):
+        velocity = wavelengths * multipliers[l] - c
+        total += -leading_constants[l] * Voigt(velocity, sigma, gammas[l])
+    raw_profile_loop = np.exp(nhi * total)
+
+    assert np.allclose(raw_profile, raw_profile_loop, rtol=1e-8, atol=1e-12)
+
+
+def test_wofz_buffers_reuse():
+    """
+    Reusing the wofz scratch buffers across calls with different shapes
+    should not change the profiles.
+    """
+    z_qso = 3.15
+    wavelengths = np.linspace(911, 1216, 1000) * (1 + z_qso)
+
+    profile = voigt_absorption(wavelengths, 10 ** 20.3, 3.1, num_lines=3)
+
+    voigt_absorption(wavelengths[:500], 10 ** 21, 3.0, num_lines=5)
+    voigt_absorption(wavelengths, 10 ** 21, 3.0, num_lines=3)
+
+    new_profile = voigt_absorption(wavelengths, 10 ** 20.3, 3.1, num_lines=3)
+    assert np.all(new_profile == profile)
+
+
+def test_voigt_absorption_nb():
+    """
+    The Numba kernel (Humlicek w4 approximation of wofz) should agree with
+    the scipy version of the Voigt profile.
+    """
+    import pytest
+
+    pytest.importorskip("numba")
+    from gpy_dla_detection.voigt_jit import voigt_absorption_nb
+
+    z_qso = 3.15
+    wavelengths = np.linspace(911, 1216, 1000) * (1 + z_qso)
+
+    for z_dla, nhi in [(3.1, 10 ** 20.3), (2.8, 10 ** 21.5)]:
+        for broadening in [True, False]:
+            profile = voigt_absorption(
+                wavelengths, nhi, z_dla, num_lines=3, broadening=broadening
+            )
+            profile_nb = voigt_absorption_nb(wavelengths, nhi, z_dla, 3, broadening)
+
+            assert profile.shape == profile_nb.shape
+            assert np.all(np.abs(profile - profile_nb) < 1e-4)
+
+
+def test_voigt_absorption_nb_int_args():
+    """
+    Like voigt.voigt_absorption, the Numba version should accept integer
+    nhi and z_dla, including an nhi beyond the int64 range.
+    """
+    import pytest
+
+    pytest.importorskip("numba")
+    from gpy_dla_detection.voigt_jit import voigt_absorption_nb
+
+    wavelengths = np.linspace(911, 1216, 1000) * (1 + 3.15)
+
+    for nhi in [10 ** 18, 10 ** 21]:
+        profile = voigt_absorption(wavelengths, nhi, 3)
+        profile_nb = voigt_absorption_nb(wavelengths, nhi, 3)
+
+        assert np.all(np.abs(profile - profile_nb) < 1e-4)
+
+
+def test_broadening_stencil():
+    """
+    The unrolled instrumental broadening should match numpy's convolution.
+    """
+    z_qso = 3.15
+    wavelengths = np.linspace(911, 1216, 1000) * (1 + z_qso)
+
+    z_dla = 3.1
+    nhi = 10 ** 20.3
+
+    raw_profile = voigt_absorption(
+        wavelengths, nhi, z_dla, num_lines=3, broadening=False
+    )
+    profile = voigt_absorption(wavelengths, nhi, z_dla, num_lines=3, broadening=True)
+
+    profile_numpy = np.convolve(raw_profile, instrument_profile, "valid")
+
+    assert profile.shape == profile_numpy.shape
+    assert np.allclose(profile, profile_numpy, rtol=1e-12, atol=1e-15)